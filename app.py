@@ -9,33 +9,43 @@ from flask import (
     url_for,
     flash,
     send_from_directory,
+    stream_with_context,
 )
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
 import requests
-from bs4 import BeautifulSoup
+import http.cookiejar
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 from together import Together
 from openai import OpenAI
 import os
 import json
+import orjson
+from flask.json.provider import DefaultJSONProvider
+import hashlib
 from dotenv import load_dotenv
 import logging
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
-import uuid
+import secrets
 import re
 from datetime import datetime, timedelta
 import time
 from alembic import op
 import sqlalchemy as sa
-from functools import wraps
+from functools import wraps, lru_cache
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 import numpy as np
-from sqlalchemy import func
+from sqlalchemy import func, select, insert, bindparam
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from flask import jsonify, request
 import smtplib
 from email.mime.text import MIMEText
@@ -46,6 +56,7 @@ import woocommerce
 import sqlalchemy
 from collections import defaultdict
 from itsdangerous import URLSafeTimedSerializer
+import redis
 
 # Import models
 from models import db, User, APIKey, CustomPrompt, Analytics, AIModel, ModelReview, FineTuneJob, ChatInteraction, Conversation, EcommerceIntegration, Team, TeamMember
@@ -65,7 +76,22 @@ if not openai_api_key:
 together_client = Together(api_key=together_api_key)
 openai_client = OpenAI(api_key=openai_api_key, base_url="https://api.aimlapi.com")
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize jsonify()/request.json through orjson, keeping Flask's output format."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
 # Add this after creating the Flask app
@@ -75,11 +101,18 @@ app.config['GITHUB_CLIENT_ID'] = os.getenv('GITHUB_CLIENT_ID')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set up rate limiting
+redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Set up rate limiting (Redis-backed so limits are shared across workers).
+# If Redis is down, limits fall back to per-process memory instead of failing requests.
 limiter = Limiter(
     key_func=get_remote_address,
     app=app,
     default_limits=["2000 per day", "1000 per hour"],
+    storage_uri=redis_url,
+    strategy="moving-window",
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
 )
 
 # Configure SQLAlchemy
@@ -87,9 +120,23 @@ app.config["SECRET_KEY"] = os.getenv(
     "SECRET_KEY", "fallback_secret_key_for_development"
 )
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///users.db")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"query_cache_size": 1200}
+# Connection pool tuning for the server database (SQLite keeps its default pool)
+if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update({
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+    })
 db.init_app(app)
 migrate = Migrate(app, db)
 
+# Shared state that must be visible to every worker lives in Redis
+redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+
 # Define the login_required decorator
 def login_required(f):
     @wraps(f)
@@ -99,17 +146,96 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Argon2 for new hashes; older Werkzeug pbkdf2 hashes are still accepted and
+# upgraded on the next successful login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def verify_password(stored_hash, password):
+    if not stored_hash.startswith("$argon2"):
+        return check_password_hash(stored_hash, password)
+    try:
+        return password_hasher.verify(stored_hash, password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+def password_needs_rehash(stored_hash):
+    return not stored_hash.startswith("$argon2") or password_hasher.check_needs_rehash(stored_hash)
+
+# Built once so the compiled SQL is reused from the statement cache
+user_by_email_stmt = select(User).where(User.email == bindparam("email"))
+
+def get_user_by_email(email):
+    return db.session.execute(user_by_email_stmt, {"email": email}).scalar_one_or_none()
+
+# Limits for fetching pages in extract_text_from_url
+FETCH_TIMEOUT = (3, 10)  # (connect, read) seconds
+FETCH_MAX_BYTES = 2_000_000
+FETCH_CHUNK_SIZE = 65536
+
+# Shared session so repeated fetches reuse keep-alive connections. It serves every
+# user, so it must not keep cookies, and read timeouts are not retried so a slow
+# URL still fails after FETCH_TIMEOUT
+http_session = requests.Session()
+http_session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+fetch_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, read=0, backoff_factor=0.1),
+)
+http_session.mount("http://", fetch_adapter)
+http_session.mount("https://", fetch_adapter)
+
+HEADER_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+def decode_html(body, content_type):
+    # Lexbor reads bytes as UTF-8 only, so honour the HTTP charset first,
+    # then <meta charset>, and fall back to UTF-8
+    match = HEADER_CHARSET_RE.search(content_type or "")
+    encoding = match.group(1) if match else None
+    if not encoding:
+        match = META_CHARSET_RE.search(body[:4096])
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
 def extract_text_from_url(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    return " ".join([p.text for p in soup.find_all("p")])
+    chunks = []
+    total = 0
+    with http_session.get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type")
+        for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= FETCH_MAX_BYTES:
+                break
+
+    html = decode_html(b"".join(chunks)[:FETCH_MAX_BYTES], content_type)
+    tree = LexborHTMLParser(html)
+    return " ".join(node.text() for node in tree.css("p"))
+
+def generate_integration_url(api_key):
+    return f"https://infin8t.tech/chatbot.js?api_key={api_key}"
 
 def generate_integration_code(api_key):
     return f"""
 <!-- AI Chatbot Integration -->
-<script src="https://infin8t.tech/chatbot.js?api_key={api_key}"></script>
+<script src="{generate_integration_url(api_key)}"></script>
 """
 
+@lru_cache(maxsize=1)
+def load_chatbot_script_parts():
+    # Read design.txt once and split it around the API key placeholder
+    script_path = os.path.join(app.root_path, "design.txt")
+    with open(script_path, "r") as file:
+        return tuple(file.read().split("{api_key}"))
+
 @app.route("/chatbot.js", methods=["GET", "POST"])
 def chatbot_script():
     try:
@@ -118,15 +244,12 @@ def chatbot_script():
             app.logger.error("API key not provided in request")
             return jsonify({"error": "API key is required"}), 400
 
-        # Read the script from design.txt
-        script_path = os.path.join(app.root_path, "design.txt")
-        with open(script_path, "r") as file:
-            script = file.read()
-
-        # Replace placeholders with actual API key
-        script = script.replace("{api_key}", api_key)
+        script = api_key.join(load_chatbot_script_parts())
 
-        return Response(script, mimetype="application/javascript")
+        response = Response(script, mimetype="application/javascript")
+        # The URL is unique per API key, so browsers and CDNs can hold it for a day
+        response.headers["Cache-Control"] = "public, max-age=86400"
+        return response
     except Exception as e:
         app.logger.error(f"Error in chatbot_script: {str(e)}")
         return (
@@ -179,12 +302,12 @@ SMTP_PORT = int(os.getenv("SMTP_PORT"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 
-# Store OTPs temporarily (in a real application, use a database)
-otps = {}
+# OTPs are kept in Redis so they expire on their own and work across workers
+OTP_TTL_SECONDS = 10 * 60
 
 def send_otp(email):
     otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    otps[email] = otp
+    redis_client.set(f"otp:{email}", otp, ex=OTP_TTL_SECONDS)
 
     message = MIMEMultipart()
     message["From"] = SMTP_USERNAME
@@ -239,19 +362,19 @@ def register():
     if not email or not password or not otp:
         return jsonify({"error": "Email, password, and OTP are required"}), 400
 
-    if otps.get(email) != otp:
+    if redis_client.get(f"otp:{email}") != otp:
         return jsonify({"error": "Invalid OTP"}), 400
 
-    if User.query.filter_by(email=email).first():
+    if get_user_by_email(email):
         return jsonify({"error": "Email already registered"}), 400
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
     new_user = User(email=email, password=hashed_password)
     db.session.add(new_user)
     db.session.commit()
 
     # Clear the OTP after successful registration
-    del otps[email]
+    redis_client.delete(f"otp:{email}")
 
     return jsonify({"message": "Registration successful"}), 201
 
@@ -261,8 +384,11 @@ def login():
     email = data.get("email")
     password = data.get("password")
 
-    user = User.query.filter_by(email=email).first()
-    if user and check_password_hash(user.password, password):
+    user = get_user_by_email(email)
+    if user and verify_password(user.password, password):
+        if password_needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
         session["user_id"] = user.id
         return jsonify({"message": "Logged in successfully", "redirect": "/dashboard/home"}), 200
 
@@ -286,15 +412,17 @@ def process_url():
 
     try:
         extracted_text = extract_text_from_url(url)
-        api_key = f"user_{uuid.uuid4().hex}"
-
-        new_api_key = APIKey(
-            key=api_key,
-            llm=llm,
-            extracted_text=extracted_text,
-            user_id=session["user_id"],
+        api_key = f"user_{secrets.token_urlsafe(16)}"
+
+        # Single INSERT; the User row is never loaded
+        db.session.execute(
+            insert(APIKey).values(
+                key=api_key,
+                llm=llm,
+                extracted_text=extracted_text,
+                user_id=session["user_id"],
+            )
         )
-        db.session.add(new_api_key)
         db.session.commit()
 
         integration_code = generate_integration_code(api_key)
@@ -304,6 +432,7 @@ def process_url():
                 "message": "Processing complete",
                 "api_key": api_key,
                 "llm": llm,
+                "integration_url": generate_integration_url(api_key),
                 "integration_code": integration_code,
             }
         )
@@ -333,6 +462,36 @@ def process_ecommerce_response(response):
         # If no product information is found, return the response as is
         return {"response": response}
 
+# Identical questions to the same bot within this window reuse the last answer.
+# The raw LLM text is cached, so streamed clients always get plain text and
+# JSON clients always get process_raw_response()'s structure
+CHAT_CACHE_TTL_SECONDS = 5 * 60
+
+# Upper bound on how much scraped page text goes into the system prompt
+CHAT_CONTEXT_MAX_CHARS = 12000
+
+def chat_cache_key(api_key, history):
+    # history is the recent turns sent to the LLM (ending with the new input),
+    # so a short follow-up only hits the cache within the same context
+    payload = json.dumps([api_key, history], sort_keys=True)
+    digest = hashlib.blake2b(payload.encode()).hexdigest()
+    return f"chat-raw:{digest}"
+
+def get_cached_chat_response(cache_key):
+    # The cache is an optimization; if Redis is unavailable just call the LLM
+    try:
+        cached_response = redis_client.get(cache_key)
+    except redis.RedisError as e:
+        logger.warning(f"Chat cache read failed: {str(e)}")
+        return None
+    return cached_response
+
+def cache_chat_response(cache_key, raw_response):
+    try:
+        redis_client.setex(cache_key, CHAT_CACHE_TTL_SECONDS, raw_response)
+    except redis.RedisError as e:
+        logger.warning(f"Chat cache write failed: {str(e)}")
+
 # Modify the chat route to improve memory handling
 @app.route("/chat", methods=["POST", "OPTIONS"])
 @limiter.limit("50 per minute")
@@ -362,8 +521,9 @@ def chat():
         # Append user input to conversation history
         conversation.messages.append({"role": "user", "content": user_input})
 
-        # Fetch the extracted text associated with this API key
-        context = api_key_data.extracted_text
+        # Fetch the extracted text associated with this API key, capped so large
+        # pages don't get shipped to the LLM on every message
+        context = (api_key_data.extracted_text or "")[:CHAT_CONTEXT_MAX_CHARS]
 
         # Fetch custom prompts for the user
         custom_prompts = CustomPrompt.query.filter_by(user_id=api_key_data.user_id).all()
@@ -413,12 +573,75 @@ If you need more information to answer accurately, ask the user a clarifying que
 
         logger.info(f"Sending request to AI service with input: {user_input}")
 
-        ai_response = get_ai_response(api_key_data.llm, messages)
+        cache_key = chat_cache_key(api_key, conversation.messages[-5:])
+
+        def generate_stream(chunks, conversation_id, history, user_id):
+            # Send text to the client as it arrives. The reply and analytics are saved
+            # in finally so a client disconnecting mid-stream (GeneratorExit) still
+            # records them. Only plain values are captured from the view.
+            parts = []
+            status_code = 499  # client closed the connection before the end
+            try:
+                for text in chunks:
+                    parts.append(text)
+                    yield text
+                status_code = 200
+            except Exception as e:
+                # Headers are already sent, so the error can only be logged and recorded
+                app.logger.error(f"Error streaming chat response: {str(e)}", exc_info=True)
+                status_code = 500
+            finally:
+                raw_response = "".join(parts)
+                try:
+                    if status_code == 200:
+                        cache_chat_response(cache_key, raw_response)
+
+                    conversation = db.session.get(Conversation, conversation_id)
+                    reply = []
+                    if raw_response:
+                        reply = [{"role": "assistant", "content": json.dumps(process_raw_response(raw_response))}]
+                    conversation.messages = history + reply
+                    conversation.updated_at = datetime.utcnow()
+                    db.session.add(
+                        Analytics(
+                            user_id=user_id,
+                            api_key=api_key,
+                            endpoint="/chat",
+                            response_time=time.time() - start_time,
+                            status_code=status_code,
+                        )
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    app.logger.error(f"Error saving streamed chat response: {str(e)}", exc_info=True)
+                    db.session.rollback()
+
+        raw_response = get_cached_chat_response(cache_key)
+        if request.json.get("stream"):
+            if raw_response is None:
+                # Start the completion before any bytes go out so bad LLM choices and
+                # API errors still get the JSON 500 below
+                chunks = stream_ai_response(api_key_data.llm, messages)
+            else:
+                chunks = iter([raw_response])
+            history = list(conversation.messages)
+            user_id = api_key_data.user_id
+            db.session.commit()
+            return Response(
+                stream_with_context(generate_stream(chunks, conversation.id, history, user_id)),
+                mimetype="text/plain",
+            )
+
+        if raw_response is None:
+            raw_response = get_raw_ai_response(api_key_data.llm, messages)
+            cache_chat_response(cache_key, raw_response)
+        ai_response = process_raw_response(raw_response)
 
         logger.info(f"Received response from AI service: {ai_response}")
 
-        # Append AI response to conversation history
-        conversation.messages.append({"role": "assistant", "content": json.dumps(ai_response)})
+        # Append AI response to conversation history. messages is a plain JSON column,
+        # so assign a new list; in-place appends are not tracked by the ORM
+        conversation.messages = conversation.messages + [{"role": "assistant", "content": json.dumps(ai_response)}]
         conversation.updated_at = datetime.utcnow()
         db.session.commit()
 
@@ -519,7 +742,7 @@ def clear_chat_history():
 # The rest of your code remains the same
 
 
-def get_ai_response(llm_type, messages):
+def create_completion(llm_type, messages, stream=False):
     user_id = session.get("user_id")
     
     if user_id:
@@ -543,22 +766,31 @@ def get_ai_response(llm_type, messages):
             top_k=100,
             repetition_penalty=1,
             stop=["<|eot_id|>", "<|eom_id|>"],
+            stream=stream,
         )
-        raw_response = response.choices[0].message.content
     elif llm_type == "openai":
         response = openai_client.chat.completions.create(
-            model="gpt-4", messages=messages, max_tokens=128, temperature=0.7
+            model="gpt-4", messages=messages, max_tokens=128, temperature=0.7, stream=stream
         )
-        raw_response = response.choices[0].message.content
     else:
         raise ValueError("Invalid LLM specified")
 
+    return response
+
+def stream_ai_response(llm_type, messages):
+    # The request is made here, not lazily, so errors are raised to the caller
+    completion = create_completion(llm_type, messages, stream=True)
+    return (chunk.choices[0].delta.content or "" for chunk in completion if chunk.choices)
+
+def get_raw_ai_response(llm_type, messages):
+    response = create_completion(llm_type, messages)
+    raw_response = response.choices[0].message.content
+
     # Ensure raw_response is a string
     if not isinstance(raw_response, str):
         raw_response = str(raw_response)
 
-    structured_response = process_raw_response(raw_response)
-    return structured_response
+    return raw_response
 
 def process_raw_response(raw_response):
     # Split the response into sentences
@@ -624,8 +856,11 @@ def process_ecommerce_response(response):
 @app.route("/dashboard/home/user/api_keys", methods=["GET"])
 @login_required
 def get_user_api_keys():
-    user = User.query.get(session["user_id"])
-    api_keys = [{"id": key.id, "key": key.key, "llm": key.llm} for key in user.api_keys]
+    # Select only the listed columns so extracted_text is never loaded
+    rows = db.session.execute(
+        select(APIKey.id, APIKey.key, APIKey.llm).where(APIKey.user_id == session["user_id"])
+    )
+    api_keys = [{"id": row.id, "key": row.key, "llm": row.llm} for row in rows]
     return jsonify({"api_keys": api_keys})
 
 
@@ -717,14 +952,14 @@ def test_apis():
 @app.route("/dashboard/home/api/update_profile", methods=["POST"])
 @login_required
 def update_profile():
-    user = User.query.get(session["user_id"])
+    user = db.session.get(User, session["user_id"])
     
     new_email = request.form.get("email")
     new_password = request.form.get("new_password")
     confirm_password = request.form.get("confirm_password")
 
     if new_email and new_email != user.email:
-        if User.query.filter_by(email=new_email).first():
+        if get_user_by_email(new_email):
             flash("Email already in use", "error")
         else:
             user.email = new_email
@@ -732,7 +967,7 @@ def update_profile():
 
     if new_password:
         if new_password == confirm_password:
-            user.password = generate_password_hash(new_password)
+            user.password = hash_password(new_password)
             flash("Password updated successfully", "success")
         else:
             flash("Passwords do not match", "error")
@@ -744,7 +979,7 @@ def update_profile():
 @app.route("/dashboard/<section>")
 @login_required
 def dashboard_section(section=None):
-    user = User.query.get(session["user_id"])
+    user = db.session.get(User, session["user_id"])
     custom_prompts = CustomPrompt.query.filter_by(user_id=user.id).all()
     return render_template("dashboard.html", user=user, active_section=section or "home", custom_prompts=custom_prompts)
 
@@ -760,7 +995,7 @@ def subscription_page():
 @app.route("/profile", methods=["GET", "POST"])
 @login_required
 def profile():
-    user = User.query.get(session["user_id"])
+    user = db.session.get(User, session["user_id"])
 
     if request.method == "POST":
         new_email = request.form.get("email")
@@ -771,7 +1006,7 @@ def profile():
             user.email = new_email
 
         if new_password and new_password == confirm_password:
-            user.password = generate_password_hash(new_password)
+            user.password = hash_password(new_password)
         elif new_password and new_password != confirm_password:
             flash("Passwords do not match", "error")
             return redirect(url_for("profile"))
@@ -826,9 +1061,9 @@ def add_custom_prompt():
 def change_password():
     current_password = request.form.get("current_password")
     new_password = request.form.get("new_password")
-    user = User.query.get(session["user_id"])
-    if user and check_password_hash(user.password, current_password):
-        user.password = generate_password_hash(new_password)
+    user = db.session.get(User, session["user_id"])
+    if user and verify_password(user.password, current_password):
+        user.password = hash_password(new_password)
         db.session.commit()
         flash("Password changed successfully", "success")
     else:
@@ -1100,7 +1335,7 @@ def delete_ecommerce_integration(integration_id):
 @app.route('/api/teams', methods=['GET'])
 @login_required
 def get_teams():
-    user = User.query.get(session['user_id'])
+    user = db.session.get(User, session['user_id'])
     teams = [{'id': tm.team.id, 'name': tm.team.name, 'role': tm.role} for tm in user.team_memberships]
     return jsonify(teams)
 
@@ -1112,7 +1347,7 @@ def create_team():
         return jsonify({'error': 'Team name is required'}), 400
 
     user_id = session.get('user_id')
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
@@ -1138,7 +1373,7 @@ def invite_team_member(team_id):
     if not team:
         return jsonify({'error': 'Team not found'}), 404
 
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
@@ -1200,9 +1435,9 @@ def github_login():
     email = next((email['email'] for email in email_data if email['primary']), None)
     
     # Check if user exists, if not create a new user
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     if not user:
-        user = User(email=email, password=generate_password_hash('github_oauth_user'))
+        user = User(email=email, password=hash_password('github_oauth_user'))
         db.session.add(user)
         db.session.commit()
     
@@ -1275,7 +1510,7 @@ s = URLSafeTimedSerializer(app.config['SECRET_KEY'])
 @app.route('/request-password-reset', methods=['POST'])
 def request_password_reset():
     email = request.json.get('email')
-    user = User.query.filter_by(email=email).first()
+    user = get_user_by_email(email)
     if not user:
         return jsonify({"error": "No user found with that email address"}), 404
 
@@ -1302,9 +1537,9 @@ def reset_password(token):
         if new_password != confirm_password:
             return render_template('auth.html', error="Passwords do not match.")
 
-        user = User.query.filter_by(email=email).first()
+        user = get_user_by_email(email)
         if user:
-            user.password = generate_password_hash(new_password)
+            user.password = hash_password(new_password)
             db.session.commit()
             return render_template('auth.html', message="Your password has been reset successfully. You can now log in with your new password.")
         else:
@@ -1338,13 +1573,25 @@ def send_password_reset_email(email, reset_url):
         server.login(SMTP_USERNAME, SMTP_PASSWORD)
         server.send_message(message)
 
-if __name__ == "__main__":
+def init_scheduler(scheduler):
     with app.app_context():
         db.create_all()
-    
+
     # Schedule the deletion of old conversations every 24 hours
-    scheduler = BackgroundScheduler()
     scheduler.add_job(func=delete_old_conversations, trigger="interval", hours=24)
+    return scheduler
+
+def start_background_jobs():
+    scheduler = init_scheduler(BackgroundScheduler())
     scheduler.start()
-    
+    return scheduler
+
+@app.cli.command("run-scheduler")
+def run_scheduler():
+    """Create the tables and run the conversation cleanup job until stopped."""
+    init_scheduler(BlockingScheduler()).start()
+
+if __name__ == "__main__":
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    start_background_jobs()
     app.run(debug=True, port=5410)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import threading
+
+# Gunicorn settings for production: gunicorn app:app
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+
+# Views are synchronous; threaded workers let each worker overlap many slow
+# URL fetches and LLM calls
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# LLM responses are streamed, so allow long-lived requests
+timeout = 120
+keepalive = 5
+
+SCHEDULER_COMMAND = [sys.executable, "-m", "flask", "--app", "app", "run-scheduler"]
+SCHEDULER_MAX_BACKOFF = 300
+
+scheduler_process = None
+scheduler_stopping = threading.Event()
+
+
+def supervise_scheduler(server):
+    # Keep the scheduler child running, restarting it with backoff if it exits
+    global scheduler_process
+    backoff = 1
+    while not scheduler_stopping.is_set():
+        scheduler_process = subprocess.Popen(SCHEDULER_COMMAND)
+        server.log.info(f"Started scheduler process (pid {scheduler_process.pid})")
+        returncode = scheduler_process.wait()
+        if scheduler_stopping.is_set():
+            break
+        server.log.error(f"Scheduler process exited with code {returncode}; restarting in {backoff}s")
+        scheduler_stopping.wait(backoff)
+        backoff = min(backoff * 2, SCHEDULER_MAX_BACKOFF)
+
+
+def when_ready(server):
+    # The master never imports the app, so workers don't inherit its database
+    # engine; table creation and the cleanup job run in their own process
+    threading.Thread(target=supervise_scheduler, args=(server,), daemon=True).start()
+
+
+def on_exit(server):
+    scheduler_stopping.set()
+    if scheduler_process is None or scheduler_process.poll() is not None:
+        return
+    scheduler_process.terminate()
+    try:
+        returncode = scheduler_process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.log.warning("Scheduler process did not stop in 10s; killing it")
+        scheduler_process.kill()
+        returncode = scheduler_process.wait()
+    server.log.info(f"Scheduler process exited with code {returncode}")
@@ -6,7 +6,7 @@ db = SQLAlchemy()
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
     api_keys = db.relationship("APIKey", backref="user", lazy=True)
     custom_prompts = db.relationship("CustomPrompt", backref="user", lazy=True)
@@ -17,7 +17,7 @@ class User(db.Model):
 class APIKey(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(64), unique=True, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     llm = db.Column(db.String(50), nullable=False)
     extracted_text = db.Column(db.Text)
     conversations = db.relationship('Conversation', backref='api_key', cascade='all, delete-orphan')